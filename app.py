@@ -1,8 +1,10 @@
 import os
-import uuid # To generate unique filenames
-from flask import Flask, request, render_template, redirect, url_for, flash
-from werkzeug.utils import secure_filename
-from text_processor import process_text_file, initialize_nltk_on_server
+import multiprocessing
+import shutil
+import tempfile
+from flask import Flask, request, render_template, redirect, url_for, flash, jsonify
+from werkzeug.exceptions import HTTPException
+from text_processor import process_text_file, process_text_from_bytes, initialize_nltk_on_server
 import traceback
 
 # --- Configuration ---
@@ -19,13 +21,19 @@ app.config['SECRET_KEY'] = 'your_very_secret_key_here' # Important for flashing
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 # --- NLTK Initialization ---
-# Attempt to initialize NLTK when the app starts.
+# Attempt to initialize NLTK when the app starts. Usually text_processor has
+# already done this at import and the call returns at once; it still runs
+# here when WARMUP_NLTK=0, since the app cannot lemmatize without it.
 # If it fails, the app might still run, but processing will fail later.
-nltk_ready = initialize_nltk_on_server()
-if not nltk_ready:
-    print("WARNING: NLTK initialization failed. Text processing will not work.")
-    # You could prevent the app from starting here if desired:
-    # raise RuntimeError("NLTK failed to initialize. Cannot start application.")
+# Page extraction workers re-run this module as __main__ under spawn, and
+# serve no requests, so they skip it.
+nltk_ready = False
+if multiprocessing.current_process().name == "MainProcess":
+    nltk_ready = initialize_nltk_on_server()
+    if not nltk_ready:
+        print("WARNING: NLTK initialization failed. Text processing will not work.")
+        # You could prevent the app from starting here if desired:
+        # raise RuntimeError("NLTK failed to initialize. Cannot start application.")
 
 # --- Helper Function ---
 def allowed_file(filename):
@@ -38,7 +46,12 @@ def allowed_file(filename):
 def index():
     if request.method == 'POST':
         # --- File Upload Handling ---
-        if not nltk_ready:
+        # The form sends a hidden "0" before the checkbox's "1", so an
+        # unchecked box still arrives; clients that omit the field lemmatize.
+        lemmatize_values = request.form.getlist('lemmatize')
+        lemmatize = '1' in lemmatize_values if lemmatize_values else True
+        # The stemmer needs no NLTK data, so only lemmatizing depends on it
+        if lemmatize and not nltk_ready:
             flash('Server error: Text processing components are not ready.', 'danger')
             return render_template('index.html')
 
@@ -67,27 +80,10 @@ def index():
 
 
         if file:
-            # Create a secure, unique filename
-            # secure_filename removes potentially dangerous characters
-            # uuid ensures no collisions even if users upload files with the same name
-            filename_base = secure_filename(os.path.splitext(file.filename)[0])
-            unique_id = uuid.uuid4().hex[:8] # Short unique ID
-            filename = f"{filename_base}_{unique_id}.pdf"
-            pdf_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-
             try:
-                file.save(pdf_path)
-                print(f"File saved to: {pdf_path}")
-
-                # --- Process the saved file ---
-                results = process_text_file(pdf_path, num_words)
-
-                # --- Clean up the uploaded file ---
-                try:
-                    os.remove(pdf_path)
-                    print(f"Removed temporary file: {pdf_path}")
-                except OSError as e:
-                    print(f"Error removing file {pdf_path}: {e}") # Log error, but continue
+                # --- Process the upload in memory (no temporary file) ---
+                data = file.read()
+                results = process_text_from_bytes(data, num_words, lemmatize)
 
                 # --- Display Results ---
                 # Check if results indicate an error
@@ -100,19 +96,67 @@ def index():
                     return render_template('results.html', words=results, filename=file.filename)
 
             except Exception as e:
-                # Catch potential errors during file save or processing call
+                # Catch potential errors during file read or processing call
                 print(f"Error during file handling or processing: {e}")
                 traceback.print_exc()
                 flash(f'An unexpected error occurred: {e}', 'danger')
-                 # Clean up if file was saved but processing failed
-                if os.path.exists(pdf_path):
-                    try: os.remove(pdf_path)
-                    except OSError: pass
                 return redirect(request.url) # Redirect back to upload form
 
     # --- GET Request: Show the upload form ---
     return render_template('index.html')
 
+@app.route('/upload-raw', methods=['POST'])
+def upload_raw():
+    """
+    Fast path for non-browser clients: the request body is the PDF itself
+    (Content-Type: application/pdf), N is given as ?num_words= and
+    ?lemmatize=0 switches to the faster stemmer.
+    The body is streamed straight to disk, skipping multipart form parsing.
+    """
+    if request.mimetype != 'application/pdf':
+        return jsonify(error='Request body must be a PDF sent as Content-Type: application/pdf.'), 415
+
+    try:
+        num_words = int(request.args.get('num_words', '100'))
+        if num_words < 1 or num_words > 1000:
+            raise ValueError("Number of words out of range.")
+    except ValueError:
+        return jsonify(error='Invalid number of words (must be between 1 and 1000).'), 400
+    lemmatize = request.args.get('lemmatize', '1') != '0'
+    # The stemmer needs no NLTK data, so only lemmatizing depends on it
+    if lemmatize and not nltk_ready:
+        return jsonify(error='Server error: Text processing components are not ready.'), 503
+
+    # Reject oversized bodies up front; chunked bodies without a length are
+    # still cut off by MAX_CONTENT_LENGTH while streaming (handled below)
+    if request.content_length is not None and request.content_length > app.config['MAX_CONTENT_LENGTH']:
+        limit_mb = app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+        return jsonify(error=f'PDF is larger than the {limit_mb} MB upload limit.'), 413
+
+    tmp = None
+    try:
+        # NamedTemporaryFile picks a collision-free name atomically (O_EXCL)
+        tmp = tempfile.NamedTemporaryFile(suffix='.pdf', dir=app.config['UPLOAD_FOLDER'], delete=False)
+        with tmp:
+            shutil.copyfileobj(request.stream, tmp, length=64 * 1024)
+        results = process_text_file(tmp.name, num_words, lemmatize)
+    except HTTPException as e:
+        # e.g. RequestEntityTooLarge raised by the stream: keep its own status
+        return jsonify(error=e.description), e.code
+    except Exception as e:
+        print(f"Error during raw upload handling or processing: {e}")
+        traceback.print_exc()
+        return jsonify(error=f'An unexpected error occurred: {e}'), 500
+    finally:
+        if tmp is not None:
+            os.unlink(tmp.name)
+
+    if results and results[0][0] == "Info":
+        return jsonify(words=[], message=results[0][1])
+    if results and results[0][0].startswith("Error"):
+        return jsonify(error=f"{results[0][0]}: {results[0][1]}"), 422
+    return jsonify(words=results)
+
 # --- Optional: Add a route to serve results if you keep them separate ---
 # (Results are currently shown directly after POST)
 
@@ -0,0 +1,27 @@
+# stopwords.py
+"""Single source of the stop words filtered out of the word counts."""
+
+_STOP_WORD_LIST = (
+    "a", "an", "the", "in", "on", "at", "to", "for", "of", "with", "by", "as",
+    "is", "am", "are", "was", "were", "be", "being", "been",
+    "it", "its", "it's", "i", "you", "he", "she", "they", "we", "my", "your",
+    "his", "her", "their", "our", "me", "him", "them", "us",
+    "and", "or", "but", "so", "if", "because", "while", "since",
+    "this", "that", "these", "those", "which", "who", "whom",
+    "also", "just", "not", "no", "very", "can", "will", "shall", "may", "might",
+    "must", "would", "could", "should", "has", "have", "had", "do", "does", "did",
+    "from", "up", "down", "out", "over", "under", "again", "further", "then", "once",
+    "here", "there", "when", "where", "why", "how", "all", "any", "both", "each",
+    "few", "more", "most", "other", "some", "such", "than", "too",
+    "et", "al", "fig", "figure", "table", "page", "vol", "journal", "university",
+    "pubmed", "doi", "org", "http", "https", "www", "author", "authors", "article",
+    "abstract", "introduction", "discussion", "conclusion", "conclusions",
+    "reference", "references", "acknowledgement", "acknowledgements", "supplementary",
+    "however", "therefore", "thus", "hence", "although", "though",
+    "within", "without", "among", "between",
+    # Single letters are left out: the length check already drops them.
+)
+
+STOP_WORDS: frozenset[str] = frozenset(_STOP_WORD_LIST)
+# Fail at import if an edit to the list above introduces a duplicate
+assert len(STOP_WORDS) == len(_STOP_WORD_LIST), "Duplicate entries in _STOP_WORD_LIST"
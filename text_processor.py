@@ -1,13 +1,36 @@
 # text_processor.py
 import collections
+import functools
+import hashlib
+import json
 import string
 import re
 import nltk
 import traceback
 import os 
+import multiprocessing
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
 import nltk.data
+from nltk.stem import SnowballStemmer
+from stopwords import STOP_WORDS
+
+try:
+    import numpy as np # Optional: faster top-N selection for large vocabularies
+except ImportError:
+    np = None
+
+try:
+    import re2 # Optional: linear-time DFA matching for the URL pattern
+except ImportError:
+    re2 = None
 
 # --- NLTK Data Setup & Initialization ---
+# USE_STEMMER=1 stems every word instead of lemmatizing it, so the server
+# never loads (or needs) the WordNet corpora.
+USE_STEMMER = os.environ.get("USE_STEMMER", "0") == "1"
+
 lemmatizer = None
 def initialize_nltk_on_server():
     """Initializes NLTK components needed, assuming data exists."""
@@ -20,16 +43,29 @@ def initialize_nltk_on_server():
     else:
         print(f"Path {user_nltk_data_path} already in nltk.data.path")
 
+    if USE_STEMMER:
+        print("USE_STEMMER is set: skipping WordNet setup, words will be stemmed.")
+        return True
+
     if lemmatizer is None:
         try:
-            print("Verifying NLTK data presence (wordnet, omw-1.4, punkt)...")
+            print("Verifying NLTK data presence (wordnet, omw-1.4)...")
             nltk.data.find('corpora/wordnet')
             nltk.data.find('corpora/omw-1.4')
-            nltk.data.find('tokenizers/punkt')
             print("NLTK data found. Initializing lemmatizer...")
+            # Parse the WordNet index and exception files into memory now;
+            # lemmatization only ever reads those in-memory maps afterwards.
+            from nltk.corpus import wordnet
+            wordnet.ensure_loaded()
             from nltk.stem import WordNetLemmatizer
             lemmatizer = WordNetLemmatizer()
+            _lemmatize.cache_clear() # Drop lemmas computed by any previous lemmatizer
             print("Lemmatizer initialized successfully on server.")
+            # Load the WordNet indexes and fill the lemma cache now rather
+            # than on the first request.
+            for word in WARMUP_WORDS:
+                _lemmatize(word)
+            print(f"Lemmatizer warmed up with {len(WARMUP_WORDS)} common words.")
             return True
         except LookupError as e:
             print(f"ERROR: Required NLTK data not found even after adding path: {e}. "
@@ -43,111 +79,438 @@ def initialize_nltk_on_server():
     else:
         return True
 
-# --- STOP_WORDS List (کامل مثل قبل) ---
-STOP_WORDS = set([
-    "a", "an", "the", "in", "on", "at", "to", "for", "of", "with", "by", "as",
-    "is", "am", "are", "was", "were", "be", "being", "been",
-    "it", "its", "it's", "i", "you", "he", "she", "they", "we", "my", "your",
-    "his", "her", "their", "our", "me", "him", "her", "them", "us",
-    "and", "or", "but", "so", "if", "because", "while", "since",
-    "this", "that", "these", "those", "which", "who", "whom",
-    "also", "just", "not", "no", "very", "can", "will", "shall", "may", "might",
-    "must", "would", "could", "should", "has", "have", "had", "do", "does", "did",
-    "from", "up", "down", "out", "over", "under", "again", "further", "then", "once",
-    "here", "there", "when", "where", "why", "how", "all", "any", "both", "each",
-    "few", "more", "most", "other", "some", "such", "than", "too",
-    "et", "al", "fig", "figure", "table", "page", "vol", "no", "journal", "university",
-    "pubmed", "doi", "org", "http", "https", "www", "author", "authors", "article",
-    "abstract", "introduction", "discussion", "conclusion", "conclusions",
-    "reference", "references", "acknowledgement", "acknowledgements", "supplementary",
-    "however", "therefore", "thus", "hence", "although", "though",
-    "within", "without", "among", "between",
-    "b", "c", "d", "e", "f", "g", "h", "j", "k", "l", "m", "n",
-    "o", "p", "q", "r", "s", "t", "u", "v", "w", "x", "y", "z"
-])
-
-
-def process_text_file(pdf_path: str, n_words: int = 100) -> list:
+# Bounds the per-word caches below; plenty for the vocabulary of any one PDF
+WORD_CACHE_SIZE = 200_000
+
+@functools.lru_cache(maxsize=WORD_CACHE_SIZE)
+def _lemmatize(word: str) -> str:
+    """Returns the noun lemma of word, or its verb lemma if the noun form is unchanged."""
+    lemma = lemmatizer.lemmatize(word, pos='n')
+    if lemma == word:
+        lemma = lemmatizer.lemmatize(word, pos='v')
+    return lemma
+
+# Faster, corpus-free alternative used when lemmatization is switched off
+_stemmer = SnowballStemmer("english")
+
+@functools.lru_cache(maxsize=WORD_CACHE_SIZE)
+def _stem(word: str) -> str:
+    """Returns the Snowball (Porter2) stem of word. Cached per word."""
+    return _stemmer.stem(word)
+
+# --- Common English words, lemmatized once at startup to warm WordNet ---
+WARMUP_WORDS = (
+    "time", "year", "people", "way", "day", "man", "thing", "woman", "life",
+    "child", "world", "school", "state", "family", "student", "group",
+    "country", "problem", "hand", "part", "place", "case", "week", "company",
+    "system", "program", "question", "work", "government", "number", "night",
+    "point", "home", "water", "room", "mother", "area", "money", "story",
+    "fact", "month", "lot", "right", "study", "book", "eye", "job", "word",
+    "business", "issue", "side", "kind", "head", "house", "service", "friend",
+    "father", "power", "hour", "game", "line", "end", "member", "law", "car",
+    "city", "community", "name", "president", "team", "minute", "idea", "kid",
+    "body", "information", "back", "parent", "face", "others", "level",
+    "office", "door", "health", "person", "art", "war", "history", "party",
+    "result", "change", "morning", "reason", "research", "girl", "guy",
+    "moment", "air", "teacher", "force", "education", "foot", "boy", "age",
+    "policy", "process", "music", "market", "sense", "nation", "plan",
+    "college", "interest", "death", "experience", "effect", "class", "control",
+    "care", "field", "development", "role", "effort", "rate", "heart", "drug",
+    "show", "leader", "light", "voice", "wife", "police", "mind", "price",
+    "report", "decision", "son", "view", "relationship", "town", "road", "arm",
+    "difference", "value", "building", "action", "model", "season", "society",
+    "tax", "director", "position", "player", "record", "paper", "space",
+    "ground", "form", "event", "official", "matter", "center", "couple", "site",
+    "project", "activity", "star", "need", "court", "oil", "situation",
+    "cost", "industry", "street", "image", "phone", "data", "picture",
+    "practice", "piece", "land", "product", "doctor", "wall", "patient",
+    "worker", "news", "test", "movie", "north", "love", "support", "technology",
+    "step", "baby", "computer", "type", "attention", "film", "tree", "source",
+    "organization", "hair", "window", "evidence", "population", "method",
+    "analysis", "sample", "cell", "gene", "protein", "treatment", "response",
+    "function", "structure", "factor", "disease", "risk", "condition",
+    "measure", "theory", "approach", "variable", "pattern", "region", "surface",
+    "energy", "material", "temperature", "pressure", "signal", "network",
+    "species", "environment", "concentration", "solution", "reaction",
+    "increase", "decrease", "find", "make", "take", "give", "use", "know",
+    "think", "come", "see", "look", "want", "tell", "ask", "seem", "feel",
+    "try", "leave", "call", "keep", "provide", "hold", "turn", "follow",
+    "begin", "bring", "happen", "write", "sit", "stand", "lose", "pay", "meet",
+    "include", "continue", "set", "learn", "lead", "understand", "watch",
+    "speak", "allow", "add", "spend", "grow", "open", "walk", "win", "offer",
+    "remember", "consider", "appear", "buy", "wait", "serve", "die", "send",
+    "expect", "build", "stay", "fall", "cut", "reach", "remain", "suggest",
+    "raise", "pass", "sell", "require", "decide", "return", "explain",
+    "develop", "carry", "break", "receive", "agree", "describe", "produce",
+    "determine", "observe", "compare", "reduce", "affect", "indicate", "occur",
+    "contain", "represent", "obtain", "perform", "identify", "associate",
+    "obtained", "observed", "showed", "found", "used", "based", "compared",
+    "associated", "reported", "significant", "higher", "lower", "large",
+    "small", "different", "important", "possible", "similar", "likely",
+)
+
+# --- Cleaning patterns, compiled once at import ---
+# The URL pattern runs over all of the text; RE2 matches it without
+# backtracking when installed, and both engines understand the inline (?i).
+_URL_RE = (re2 or re).compile(r'(?i)https?://\S+|www\.\S+|doi[:/]\S+|\b\w+/\w+\b')
+
+# Leading quotes, a trailing possessive 's, or trailing quotes
+_APOS_RE = re.compile(r"^'+|'s$|'+$")
+
+
+class _CleanTable(dict):
+    """
+    str.translate table that lowercases A-Z, keeps a-z, apostrophes and
+    whitespace, and turns every other character (digits, punctuation,
+    non-ASCII letters) into a space. Entries are filled in on first use.
+    """
+    def __missing__(self, codepoint):
+        char = chr(codepoint)
+        if 'A' <= char <= 'Z':
+            value = char.lower()
+        elif 'a' <= char <= 'z' or char == "'" or char.isspace():
+            value = char
+        else:
+            value = ' '
+        self[codepoint] = value
+        return value
+
+_CLEAN_TABLE = _CleanTable()
+
+# --- Result cache for repeated PDFs, keyed by content hash ---
+# Recent results are kept in memory and every result is also written to
+# RESULT_CACHE_DIR, so it survives restarts and is shared between workers.
+RESULT_CACHE_SIZE = 64
+RESULT_CACHE_DIR = os.environ.get("RESULT_CACHE_DIR", "result_cache")
+# Oldest files beyond this many are deleted whenever a new one is written.
+RESULT_CACHE_MAX_FILES = 1000
+# Bump when tokenizing, cleaning or lemmatizing changes in a way that alters
+# rankings. Together with the stop word list and cleaning patterns it forms
+# part of every cache key, so entries from an older pipeline are never served.
+CACHE_VERSION = 1
+_PIPELINE_VERSION = hashlib.blake2b(
+    "\n".join([str(CACHE_VERSION), _URL_RE.pattern, _APOS_RE.pattern, *sorted(STOP_WORDS)]).encode(),
+    digest_size=4,
+).hexdigest()
+# Rankings are cached at least this deep, so a later request for a
+# different number of words can be answered from the same entry.
+CACHED_WORDS = 1000
+_result_cache = collections.OrderedDict()
+_result_cache_lock = threading.Lock()
+
+# Below this many pages, starting a process pool costs more than it saves.
+PARALLEL_PAGE_THRESHOLD = 8
+# A pool is started per request, so keep it small on large shared hosts.
+MAX_PAGE_WORKERS = 4
+
+
+def _open_pdf(source):
+    """Opens a PDF given either its path or its raw bytes."""
+    import fitz # PyMuPDF
+    if isinstance(source, (bytes, bytearray)):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+
+def _page_text(page) -> str:
+    """
+    Returns the words of a page joined by spaces. The "words" extractor skips
+    the paragraph and reading-order reconstruction done by "text", which a
+    word count does not need.
+    """
+    return " ".join(word[4] for word in page.get_text("words", sort=False))
+
+
+def _tokenize(text: str) -> list:
+    """Strips URLs, cleans the text with _CLEAN_TABLE and splits it into tokens."""
+    # One regex pass for URLs, then a single translate for everything else
+    text_no_urls = _URL_RE.sub(' ', text)
+    # The cleaned text holds only letters, apostrophes and whitespace,
+    # so a plain split tokenizes it as well as word_tokenize would.
+    return text_no_urls.translate(_CLEAN_TABLE).split()
+
+
+def iter_page_texts(source):
+    """Yields the text of each page of a PDF (path or bytes), in document order."""
+    doc = _open_pdf(source)
+    try:
+        for page in doc:
+            yield _page_text(page)
+    finally:
+        doc.close()
+
+
+def iter_page_tokens(source):
+    """
+    Yields the cleaned tokens of a PDF (path or bytes) one page at a time,
+    so the full document text is never held in memory at once.
+    """
+    for page_text in iter_page_texts(source):
+        yield from _tokenize(page_text)
+
+
+# Set once per pool worker, so PDF bytes are not re-sent with every task
+_worker_source = None
+
+def _init_page_worker(source):
+    """Pool initializer: stores the PDF path or bytes for _count_page_range."""
+    global _worker_source
+    _worker_source = source
+
+
+def _count_page_range(start: int, end: int) -> collections.Counter:
+    """Pool worker: opens the PDF on its own and counts the tokens of pages [start, end)."""
+    doc = _open_pdf(_worker_source)
+    try:
+        counts = collections.Counter()
+        for page_num in range(start, end):
+            counts.update(_tokenize(_page_text(doc[page_num])))
+        return counts
+    finally:
+        doc.close()
+
+
+def _usable_cpus() -> int:
+    """Number of CPUs this process may run on, respecting affinity limits."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError: # Not available on macOS or Windows
+        return os.cpu_count() or 1
+
+
+def count_page_tokens(source) -> collections.Counter:
+    """
+    Counts the cleaned tokens of a PDF (path or bytes).
+
+    Small documents, or any document when only one CPU is usable, are
+    streamed through iter_page_tokens in this process. Larger ones are split
+    into one contiguous page range per worker (at most MAX_PAGE_WORKERS); each
+    worker extracts, cleans and counts its range, and the partial Counters are
+    summed.
+    """
+    doc = _open_pdf(source)
+    n_pages = doc.page_count
+    doc.close()
+    n_workers = min(_usable_cpus(), MAX_PAGE_WORKERS, n_pages)
+    if n_pages < PARALLEL_PAGE_THRESHOLD or n_workers < 2:
+        return collections.Counter(iter_page_tokens(source))
+
+    bounds = [n_pages * i // n_workers for i in range(n_workers + 1)]
+    counts = collections.Counter()
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_page_worker,
+                             initargs=(source,)) as pool:
+        for partial in pool.map(_count_page_range, bounds[:-1], bounds[1:]):
+            counts.update(partial)
+    return counts
+
+
+def _most_common(word_counts: collections.Counter, n_words: int) -> list:
+    """
+    Returns the n_words most frequent (word, count) pairs, exactly as
+    Counter.most_common would (ties keep insertion order). When NumPy is
+    available and the vocabulary is much larger than n_words, the selection
+    runs in C instead of a Python-level heap.
+    """
+    if np is None or len(word_counts) <= 4 * n_words:
+        return word_counts.most_common(n_words)
+
+    words = list(word_counts)
+    counts = np.fromiter(word_counts.values(), dtype=np.int64, count=len(words))
+    # Count of the n_words-th ranked word: everything above it is kept, and
+    # the remaining slots go to the words tied with it, in insertion order
+    cutoff = -np.partition(-counts, n_words - 1)[n_words - 1]
+    above = np.flatnonzero(counts > cutoff)
+    tied = np.flatnonzero(counts == cutoff)[:n_words - len(above)]
+    top = np.concatenate((above, tied))
+    top.sort() # Insertion order, so the stable sort below ranks ties as most_common does
+    top = top[np.argsort(-counts[top], kind='stable')]
+    return [(words[i], int(counts[i])) for i in top]
+
+
+def process_text_file(pdf_path: str, n_words: int = 100, lemmatize: bool = True) -> list:
     """
     Processes a PDF file located at pdf_path to find the most frequent words.
 
     Args:
         pdf_path: The full path to the uploaded PDF file on the server.
         n_words: The number of most frequent words to return.
+        lemmatize: Reduce words with the WordNet lemmatizer. If False, the much
+            faster Snowball stemmer is used instead; for a bag-of-words count the
+            difference is mostly cosmetic (e.g. "studi" instead of "study").
+            Ignored (always False) when USE_STEMMER is set.
 
     Returns:
         A list of tuples (word, frequency), sorted by frequency.
         Returns an error message list if processing fails.
     """
-    global lemmatizer
-    # Check lemmatizer status
-    if lemmatizer is None:
-        if not initialize_nltk_on_server():
-             print("ERROR: Lemmatizer is still not initialized during processing.")
-             return [("Error", "Server NLTK components are not ready (failed again).")]
+    try:
+        digest = _file_digest(pdf_path)
+    except OSError as e:
+        print(f"ERROR: Could not read PDF file at path: {pdf_path}: {e}")
+        return [("Error", "PDF file disappeared or path is incorrect.")]
+    return _cached_process_pdf(pdf_path, digest, n_words, lemmatize)
+
+
+def process_text_from_bytes(data: bytes, n_words: int = 100, lemmatize: bool = True) -> list:
+    """
+    Same as process_text_file, but for a PDF already held in memory (such as
+    an upload), so it never has to be written to disk and read back.
+    """
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    return _cached_process_pdf(data, digest, n_words, lemmatize)
+
+
+def _file_digest(path: str) -> str:
+    """BLAKE2b hex digest of a file's contents, read in 64 KiB chunks."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _cache_get(key: str):
+    """Returns the cached (depth, ranking) for key from memory or disk, or None."""
+    with _result_cache_lock:
+        if key in _result_cache:
+            _result_cache.move_to_end(key)
+            return _result_cache[key]
+    try:
+        with open(os.path.join(RESULT_CACHE_DIR, f"{key}.json")) as f:
+            stored = json.load(f)
+        entry = (stored["depth"], [tuple(pair) for pair in stored["words"]])
+    except (OSError, ValueError, KeyError):
+        return None
+    _cache_put_memory(key, entry)
+    return entry
+
+
+def _cache_put_memory(key: str, entry: tuple):
+    with _result_cache_lock:
+        _result_cache[key] = entry
+        _result_cache.move_to_end(key)
+        if len(_result_cache) > RESULT_CACHE_SIZE:
+            _result_cache.popitem(last=False)
+
+
+def _cache_put(key: str, entry: tuple):
+    """Stores entry in memory and on disk; the file is written atomically."""
+    _cache_put_memory(key, entry)
+    tmp = None
+    try:
+        os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', dir=RESULT_CACHE_DIR, suffix='.tmp', delete=False) as tmp:
+            json.dump({"depth": entry[0], "words": entry[1]}, tmp)
+        os.replace(tmp.name, os.path.join(RESULT_CACHE_DIR, f"{key}.json"))
+    except OSError as e:
+        print(f"Warning: could not write result cache file for {key}: {e}")
+        if tmp is not None: # The pruner only sees .json files, so clean up here
+            try:
+                os.unlink(tmp.name)
+            except OSError:
+                pass
+    _prune_cache_dir()
+
+
+def _prune_cache_dir():
+    """Deletes the oldest cache files once there are more than RESULT_CACHE_MAX_FILES."""
+    try:
+        with os.scandir(RESULT_CACHE_DIR) as entries:
+            files = [(e.stat().st_mtime, e.path) for e in entries if e.name.endswith('.json')]
+    except OSError:
+        return
+    if len(files) <= RESULT_CACHE_MAX_FILES:
+        return
+    files.sort()
+    for _, path in files[:len(files) - RESULT_CACHE_MAX_FILES]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass # Already removed by another worker
+
+
+def _cached_process_pdf(source, digest: str, n_words: int, lemmatize: bool) -> list:
+    """
+    Runs _process_pdf behind the result cache. Rankings are computed and
+    stored CACHED_WORDS deep, then sliced to n_words. Errors and info messages
+    are never cached.
+    """
+    mode = "lemma" if lemmatize and not USE_STEMMER else "stem"
+    key = f"{digest}_{mode}_{_PIPELINE_VERSION}"
+    entry = _cache_get(key)
+    if entry is not None:
+        depth, words = entry
+        # A ranking shorter than its depth holds every word of the document
+        if n_words <= depth or len(words) < depth:
+            print("Returning cached result for previously processed PDF.")
+            return words[:n_words]
+
+    depth = max(n_words, CACHED_WORDS)
+    results = _process_pdf(source, depth, lemmatize)
+    if results and isinstance(results[0][1], str): # ("Error", message) etc.
+        return results
+    _cache_put(key, (depth, results))
+    return results[:n_words]
+
+
+def _process_pdf(source, n_words: int, lemmatize: bool) -> list:
+    """Shared pipeline behind process_text_file and process_text_from_bytes."""
+    lemmatize = lemmatize and not USE_STEMMER
+    # NLTK is initialized at startup, never on the request path
+    # (the stemmer needs no NLTK data)
+    if lemmatize and lemmatizer is None:
+        print("ERROR: Lemmatizer is not initialized during processing.")
+        return [("Error", "Server NLTK components are not ready.")]
 
     # --- !!! Import fitz BEFORE the try block !!! ---
     import fitz # PyMuPDF
     # -----------------------------------------------
 
     try:
-        # --- 1. Extract Text using PyMuPDF ---
+        # --- 1. Extract, Clean and Tokenize Text using PyMuPDF ---
         # import fitz is now moved above
-        print(f"Processing file: {pdf_path}")
-        doc = fitz.open(pdf_path) # Now 'fitz' is guaranteed to be defined
-        raw_text = ""
-        for page in doc:
-            raw_text += page.get_text("text")
-        doc.close()
-        print(f"Extracted text length: {len(raw_text)} characters")
-        if not raw_text.strip():
+        if isinstance(source, (bytes, bytearray)):
+            print(f"Processing in-memory PDF ({len(source)} bytes)")
+        else:
+            print(f"Processing file: {source}")
+        raw_counts = count_page_tokens(source)
+        print(f"Extracted {len(raw_counts)} distinct tokens")
+        if not raw_counts:
             return [("Info", "No text could be extracted from the PDF.")]
 
-        # --- 2. Cleaning, Tokenizing, Lemmatizing ---
-        text_lower = raw_text.lower()
-        text_no_urls = re.sub(r'https?://\S+|www\.\S+|doi[:/]\S+|\b\w+/\w+\b', '', text_lower)
-        text_no_digits = re.sub(r'\d+', '', text_no_urls)
-        text_almost_clean = re.sub(r"[^a-z\s']", '', text_no_digits)
-        text_clean = re.sub(r'\s+', ' ', text_almost_clean).strip()
+        # --- 2. Lemmatizing, Counting ---
+        # Raw tokens are counted first so each distinct word is cleaned and
+        # lemmatized only once, then the counts of shared lemmas are merged.
+        # Pick the word normalizer and bind globals to locals once, outside the loop
+        normalize = _lemmatize if lemmatize else _stem
+        stop_words = STOP_WORDS
 
-        try:
-            tokens = nltk.word_tokenize(text_clean)
-        except Exception as tokenize_error:
-             print(f"NLTK tokenization failed: {tokenize_error}. Falling back to simple split.")
-             tokens = text_clean.split() # Fallback
-
-        lemmatized_words = []
-        for word in tokens:
-            cleaned_word = word.rstrip("'s") if word.endswith("'s") else word
-            cleaned_word = cleaned_word.strip("'")
-            if not cleaned_word: continue
-
-            if lemmatizer:
-                lemma = lemmatizer.lemmatize(cleaned_word, pos='n')
-                if lemma == cleaned_word:
-                     lemma = lemmatizer.lemmatize(cleaned_word, pos='v')
-            else:
-                print("Warning: Lemmatizer object is None during processing loop.")
-                lemma = cleaned_word # Fallback
-
-            if lemma not in STOP_WORDS and 2 < len(lemma) < 25:
-                lemmatized_words.append(lemma)
-
-        if not lemmatized_words:
+        word_counts = collections.Counter()
+        for word, count in raw_counts.items():
+            cleaned_word = _APOS_RE.sub('', word)
+            # Filter before lemmatizing so stop words and overlong tokens never reach WordNet
+            if not 2 < len(cleaned_word) < 25 or cleaned_word in stop_words: continue
+
+            lemma = normalize(cleaned_word)
+            if 2 < len(lemma) < 25 and lemma not in stop_words:
+                word_counts[lemma] += count
+
+        if not word_counts:
             print("No significant words found after filtering.")
             return []
 
-        # --- 3. Counting ---
-        word_counts = collections.Counter(lemmatized_words)
-        most_common = word_counts.most_common(n_words)
+        most_common = _most_common(word_counts, n_words)
 
         print(f"Found {len(most_common)} frequent words.")
         return most_common
 
     # Now these except blocks work correctly because 'fitz' is defined
-    except fitz.fitz.FileNotFoundError:
-        print(f"ERROR: PDF file not found at path: {pdf_path}")
+    except FileNotFoundError:
+        print(f"ERROR: PDF file not found at path: {source}")
         return [("Error", "PDF file disappeared or path is incorrect.")]
+    except fitz.FileDataError as e: # Raised for empty, truncated or non-PDF input
+        print(f"ERROR: Could not open PDF: {e}")
+        return [("Error processing PDF", "The PDF file seems to be corrupted or broken.")]
     except Exception as e:
         print(f"Error during PDF processing: {e}")
         traceback.print_exc() # Ensure traceback is imported in app.py for this to work if error bubbles up
@@ -156,3 +519,15 @@ def process_text_file(pdf_path: str, n_words: int = 100) -> list:
              return [("Error processing PDF", "The PDF file seems to be corrupted or broken.")]
         else:
              return [("Error processing PDF", str(e))]
+
+
+# --- Initialize NLTK once, at import ---
+# Doing this at import takes it off the request path, and under a preloading
+# server (gunicorn --preload) forked workers share the loaded WordNet data.
+# Pool workers started for page extraction never need it; their process name
+# is already set when spawn/forkserver import this module, unlike
+# parent_process(). WARMUP_NLTK=0 skips it; callers must then run
+# initialize_nltk_on_server() themselves before lemmatizing (app.py always
+# does, so the flag has no effect there).
+if os.environ.get("WARMUP_NLTK", "1") == "1" and multiprocessing.current_process().name == "MainProcess":
+    initialize_nltk_on_server()